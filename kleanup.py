@@ -1,11 +1,28 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import errno
 import sys
+import time
+import tempfile
+import threading
 import subprocess
+import multiprocessing
 from datetime import datetime, timedelta
-from shutil import disk_usage
-from collections import defaultdict
+from getpass import getpass
+from collections import defaultdict, deque
+from functools import lru_cache
+from queue import SimpleQueue
+from concurrent.futures import ThreadPoolExecutor
+from _statx import statx
+
+# Optional: compile the per-directory bucketing loop with Numba when it is installed
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
 
 # Editable priority directories
 PRIORITY_DIRECTORIES = [
@@ -38,95 +55,279 @@ EXCLUDED_DIRECTORIES = [
     '/home/kali/.mozilla/firefox/'
 ]
 
-# Function to format file sizes nicely
-def format_size(size):
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
+# Directory names to always exclude at any depth (e.g. '__pycache__'); empty by default,
+# since cloned tools, loot repos and virtualenvs under the scanned paths are evidence too
+EXCLUDED_BASENAMES = set()
+
+# Excluded directories as '/'-terminated prefixes, so a single str.startswith call checks them all
+EXCLUDED_PREFIXES = tuple(d if d.endswith('/') else d + '/' for d in EXCLUDED_DIRECTORIES)
+
+# Number of threads reading directories in parallel
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Stay on the filesystem of each base path instead of descending into other mounts, like du -x
+ONE_FILESYSTEM = '--one-filesystem' in sys.argv
 
-# Function to get file time (created or modified) based on user choice
-def get_file_time(path, use_modified=False):
+# Units used by format_size, one per power of 1024
+UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Function to format file sizes nicely, picking the unit from the bit length instead of dividing in a loop;
+# sizes are integer byte counts and many repeat (empty files, block multiples), so results are memoized
+@lru_cache(maxsize=4096)
+def format_size(size):
+    i = min((size.bit_length() - 1) // 10, len(UNITS) - 1) if size else 0
+    return f"{size / (1 << (i * 10)):.1f} {UNITS[i]}"
+
+# Shared pool of threads reading directories; directory listing and stat release the GIL
+_scan_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS)
+
+# Directories found to be off limits during this run, so overlapping scans don't try them again
+_denied = set()
+
+# Directories already read during this run by (st_dev, st_ino), so a tree reachable through a bind mount
+# is walked once even when the two paths lie under different base paths; checked and added under the lock
+_seen = set()
+_seen_lock = threading.Lock()
+
+# Set on Ctrl+C so directory reads still in flight give up instead of holding up the exit
+_stop = threading.Event()
+
+# Function to read a single directory with os.scandir, returning (root, dirs, files, st_dev) where files holds
+# (name, ctime, mtime, size) for regular files. Each file is stat'ed once relative to the directory's fd;
+# symlinks are recognised from the directory entry type without any stat, and pruned subtrees never make it into dirs.
+# A directory already read under another path is left unread, as is one on another filesystem when dev is given
+def _scan_dir(root, is_base=False, dev=None):
+    flags = os.O_RDONLY | os.O_DIRECTORY
+    if not is_base:
+        flags |= os.O_NOFOLLOW
     try:
-        if use_modified:
-            return datetime.fromtimestamp(os.path.getmtime(path))
-        else:
-            return datetime.fromtimestamp(os.stat(path).st_ctime)
-    except FileNotFoundError:
+        dir_fd = os.open(root, flags)
+    except PermissionError:
+        _denied.add(root)
+        return None  # Skip directories that can't be opened
+    except OSError:
         return None
+    try:
+        st = os.fstat(dir_fd)
+        if dev is not None and st.st_dev != dev:
+            return None
+        with _seen_lock:
+            if (st.st_dev, st.st_ino) in _seen:
+                return None
+            _seen.add((st.st_dev, st.st_ino))
+        dirs = []
+        files = []
+        prefix = root if root.endswith('/') else root + '/'
+        with os.scandir(dir_fd) as it:
+            for entry in it:
+                if _stop.is_set():
+                    return None
+                if entry.is_symlink():
+                    continue
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in EXCLUDED_BASENAMES and not (prefix + name + '/').startswith(EXCLUDED_PREFIXES):
+                        dirs.append(name)
+                    continue
+                try:
+                    ctime, mtime, size, is_reg = statx(name, dir_fd=dir_fd)
+                except FileNotFoundError:
+                    continue  # Skip entries removed since the listing
+                except PermissionError as e:
+                    # EACCES on a stat relative to the directory means no search permission on the directory
+                    # itself, so every other entry would fail too: give up on it at once. Other denials
+                    # (EPERM from seccomp or an LSM) may be specific to the entry, which is skipped
+                    if e.errno != errno.EACCES:
+                        continue
+                    _denied.add(root)
+                    return None
+                if is_reg:  # Special files are skipped
+                    files.append((name, ctime, mtime, size))
+        return root, dirs, files, st.st_dev
+    except OSError:
+        return None  # Skip directories that can't be read
+    finally:
+        os.close(dir_fd)
+
+# Function to walk a directory tree in parallel, yielding (root, dirs, files) like os.walk as directories finish.
+# Every directory read is a task on the shared pool that queues its subdirectories as new tasks, so a single
+# large tree is spread over all workers; results are handed back through a queue to the calling thread.
+# Directories in skip are listed in their parent's dirs but not descended into
+def _scan(base, skip=()):
+    results = SimpleQueue()
+    _scan_executor.submit(_scan_dir, base, True).add_done_callback(results.put)
+    outstanding = 1
+    dev = None
+    while outstanding:
+        future = results.get()
+        outstanding -= 1
+        # Interrupted: pending reads were cancelled, so stop without queueing more
+        if _stop.is_set():
+            return
+        result = future.result()
+        if result is None:
+            continue
+        root, dirs, files, root_dev = result
+        prefix = root if root.endswith('/') else root + '/'
+        if ONE_FILESYSTEM and dev is None:
+            dev = root_dev  # The base path is always the first directory read
+        for d in dirs:
+            path = prefix + d
+            if path in _denied or path in skip:
+                continue
+            _scan_executor.submit(_scan_dir, path, False, dev).add_done_callback(results.put)
+            outstanding += 1
+        yield root, dirs, files
 
 # Function to check if a path should be excluded
 def is_excluded_path(path):
-    return any(path.startswith(excluded_dir) for excluded_dir in EXCLUDED_DIRECTORIES)
+    return path.startswith(EXCLUDED_PREFIXES)
 
 # Summarize directories with similar paths
 def summarize_directories(dir_info):
-    summarized_info = defaultdict(lambda: {'count': 0, 'size': 0, 'dir_count': 0, 'file_count': 0})
+    totals = {}
     for path, info in dir_info.items():
-        common_path = "/".join(path.split("/")[:-2])  # Group by common higher-level path
-        summarized_info[common_path]['count'] += info['count']
-        summarized_info[common_path]['size'] += info['size']
-        summarized_info[common_path]['dir_count'] += info['dir_count']
-        summarized_info[common_path]['file_count'] += info['file_count']
-    return summarized_info
-
-# Function to calculate directory sizes and count files, skipping symbolic links and focusing on specific directories
-def get_directory_info(start_date, end_date=None, use_modified=False, base_paths=None):
+        common_path = path.rsplit("/", 2)[0]  # Group by common higher-level path
+        total = totals.setdefault(common_path, [0, 0, 0, 0])
+        total[0] += info['count']
+        total[1] += info['size']
+        total[2] += info['dir_count']
+        total[3] += info['file_count']
+    return {path: {'count': count, 'size': size, 'dir_count': dir_count, 'file_count': file_count}
+            for path, (count, size, dir_count, file_count) in totals.items()}
+
+# Collected entries per base path, so a tree shared by the priority and target scans is only walked once
+_entries_cache = {}
+
+# Function to walk a base path once, collecting the dir count and the names, sizes and file times of every file per directory;
+# when output_buffer is given, a (filepath, ctime, mtime, size) record of every file is appended to it from the same stat
+def _collect_entries(base_path, use_modified=False, output_buffer=None):
+    key = (base_path.rstrip('/') or '/', use_modified)
+    if key in _entries_cache:
+        return _entries_cache[key]
+    # Trees already collected below this base path are reused instead of walked again
+    prefix = key[0].rstrip('/') + '/'
+    nested = {path: cached for (path, modified), cached in list(_entries_cache.items())
+              if modified == use_modified and path != key[0] and (path + '/').startswith(prefix)}
+    entries = {}
+    for cached in nested.values():
+        # A base path's own key may carry a trailing '/', which a walk from higher up wouldn't produce
+        entries.update((root.rstrip('/'), info) for root, info in cached.items())
+    # Which file time to keep is decided once here rather than tested again for every file
+    time_index = 2 if use_modified else 1
+    for root, dirs, files in _scan(base_path, set(nested)):
+        # Skip an excluded base path; excluded subdirectories are already pruned by the walk
+        if is_excluded_path(root + '/'):
+            continue
+        names = [f[0] for f in files]
+        sizes = [f[3] for f in files]
+        times = [f[time_index] for f in files]
+        if output_buffer is not None:
+            prefix = root if root.endswith('/') else root + '/'
+            output_buffer.extend((prefix + name, ctime, mtime, size) for name, ctime, mtime, size in files)
+        if np is not None:
+            sizes = np.array(sizes, dtype=np.int64)
+            times = np.array(times, dtype=np.float64)
+        entries[root] = (len(dirs), names, sizes, times)
+    _entries_cache[key] = entries
+    return entries
+
+# Function to count and total the files of one directory inside the time window, plus the size of all its files
+def _bucket_dir(sizes, times, start_ts, end_ts):
+    count = 0
+    total_size = 0
+    all_size = 0
+    for i in range(len(sizes)):
+        all_size += sizes[i]
+        if start_ts <= times[i] < end_ts:
+            count += 1
+            total_size += sizes[i]
+    return count, total_size, all_size
+
+if np is not None:
+    _bucket_dir = njit(cache=True)(_bucket_dir)
+
+# Function to aggregate collected entries into per-directory counts and sizes for a time window, without touching the disk
+def _bucket(entries, start_ts, end_ts=None):
     dir_info = {}
-    for base_path in base_paths:
-        for root, dirs, files in os.walk(base_path, followlinks=False):
-            # Skip excluded directories
-            if is_excluded_path(root):
+    tree_info = {}  # [root, own file size, subdirectory size, dir count] per directory, for the roll-up below
+    end_ts = float('inf') if end_ts is None else end_ts
+    for root, (dir_count, _, sizes, times) in entries.items():
+        count, total_size, all_size = (int(v) for v in _bucket_dir(sizes, times, start_ts, end_ts))
+        if count > 0 or total_size > 0:
+            dir_info[root] = {
+                'count': count,
+                'size': total_size,
+                'dir_count': dir_count,
+                'file_count': count
+            }
+        tree_info[root.rstrip('/') or '/'] = [root, all_size, 0, dir_count]
+
+    # Roll subdirectory sizes up to their parents one depth level at a time, deepest first, so every
+    # directory knows the size of the files below it after a single post-order pass over the directories
+    levels = defaultdict(list)
+    for path in tree_info:
+        levels[path.count('/')].append(path)
+    for depth in sorted(levels, reverse=True):
+        for path in levels[depth]:
+            parent = os.path.dirname(path)
+            if parent != path and parent in tree_info:
+                tree_info[parent][2] += tree_info[path][1] + tree_info[path][2]
+
+    # Directories without matching files of their own still carry the size of their subdirectories
+    for root, _, subdir_total, dir_count in tree_info.values():
+        if subdir_total > 0 and root not in dir_info:
+            dir_info[root] = {
+                'count': 0,
+                'size': subdir_total,
+                'dir_count': dir_count,
+                'file_count': 0
+            }
+    return dir_info
+
+# Function to calculate directory sizes and count files under a single base path, skipping symbolic links
+def get_directory_info(start_ts, end_ts=None, use_modified=False, base_path=None, output_buffer=None):
+    return _bucket(_collect_entries(base_path, use_modified, output_buffer), start_ts, end_ts)
+
+# Function to list the files inside the time window under the selected directories, straight from the collected entries,
+# as (filepath, size) pairs sorted by path
+def get_matching_files(dir_paths, start_ts, end_ts=None):
+    prefixes = tuple(dir_path.rstrip('/') + '/' for dir_path in dir_paths)
+    end_ts = float('inf') if end_ts is None else end_ts
+    matched = {}
+    for entries in list(_entries_cache.values()):
+        for root, (_, names, sizes, times) in entries.items():
+            prefix = root.rstrip('/') + '/'
+            if not prefix.startswith(prefixes):
                 continue
-
-            count = 0
-            total_size = 0
-            dir_count = 0
-            for file in files:
-                filepath = os.path.join(root, file)
-                if is_excluded_path(filepath) or os.path.islink(filepath):
-                    continue
-                try:
-                    file_time = get_file_time(filepath, use_modified)
-                    if file_time:
-                        if end_date:
-                            if start_date <= file_time < end_date:
-                                count += 1
-                                total_size += os.path.getsize(filepath)
-                        else:
-                            if file_time >= start_date:
-                                count += 1
-                                total_size += os.path.getsize(filepath)
-                except (FileNotFoundError, PermissionError):
-                    continue  # Skip files that can't be accessed
-            # Skip directories that contain no files and whose subdirectories also contain no files
-            if count > 0 or total_size > 0:
-                dir_info[root] = {
-                    'count': count,
-                    'size': total_size,
-                    'dir_count': len(dirs),
-                    'file_count': count
-                }
-            elif dirs:  # Check if the subdirectories contain files
-                subdir_total = 0
-                for subdir in dirs:
-                    subdir_path = os.path.join(root, subdir)
-                    for subroot, subdirs, subfiles in os.walk(subdir_path, followlinks=False):
-                        for subfile in subfiles:
-                            subfile_path = os.path.join(subroot, subfile)
-                            if not is_excluded_path(subfile_path):
-                                try:
-                                    subdir_total += os.path.getsize(subfile_path)
-                                except (FileNotFoundError, PermissionError):
-                                    continue  # Skip files that can't be accessed
-                    if subdir_total > 0:
-                        dir_info[root] = {
-                            'count': count,
-                            'size': subdir_total,
-                            'dir_count': len(dirs),
-                            'file_count': count
-                        }
-                        break
+            for name, size, file_time in zip(names, sizes, times):
+                if start_ts <= file_time < end_ts:
+                    matched[prefix + name] = int(size)
+    return sorted(matched.items())
+
+# Function to drop base paths that lie inside another base path of the same list, so no tree is walked twice
+def prune_roots(paths):
+    kept = []
+    prefixes = ()
+    for path in sorted(paths, key=len):
+        prefix = path.rstrip('/') + '/'
+        if prefix.startswith(prefixes):
+            continue
+        kept.append(path)
+        prefixes += (prefix,)
+    return kept
+
+# Function to scan several base paths concurrently and summarize the combined results
+def scan_directories(start_ts, end_ts=None, use_modified=False, base_paths=None, output_buffer=None):
+    dir_info = {}
+    base_paths = prune_roots(base_paths)
+    executor = ThreadPoolExecutor(max_workers=min(8, len(base_paths)))
+    try:
+        for base_info in executor.map(lambda base_path: get_directory_info(start_ts, end_ts, use_modified, base_path, output_buffer), base_paths):
+            dir_info.update(base_info)
+    finally:
+        # On Ctrl+C don't wait for the remaining base paths; their walks see the stop flag and return
+        executor.shutdown(wait=not _stop.is_set(), cancel_futures=True)
     return summarize_directories(dir_info)
 
 # Function to list directory information with numbering and summaries
@@ -143,31 +344,78 @@ def list_directory_info(dir_info, header, start_number=1):
             display_count += 1
     return numbered_dirs
 
-# Function to list files in the selected directories
-def list_files_in_dir(dir_info, output_file):
-    with open(output_file, 'a') as f:
-        for dir_path, info in dir_info.items():
-            for root, _, files in os.walk(dir_path):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    if is_excluded_path(filepath) or os.path.islink(filepath):
-                        continue
-                    try:
-                        file_size = os.path.getsize(filepath)
-                        created_time = get_file_time(filepath).strftime("%Y-%m-%d %H:%M:%S")
-                        modified_time = datetime.fromtimestamp(os.path.getmtime(filepath)).strftime("%Y-%m-%d %H:%M:%S")
-                        f.write(f"{filepath},{format_size(file_size)},{created_time},{modified_time}\n")
-                    except (FileNotFoundError, PermissionError):
-                        continue  # Skip files that can't be accessed
-
-# Function to calculate free space on disk
-def check_disk_space(required_space):
-    total, used, free = disk_usage('/')
+# Format of the created/modified timestamps in the output file
+FMT = "%Y-%m-%d %H:%M:%S"
+
+# Function to format the detail line of a single file for the output file
+def format_file_line(filepath, ctime, mtime, size):
+    created_time = time.strftime(FMT, time.localtime(ctime))
+    modified_time = time.strftime(FMT, time.localtime(mtime))
+    return f"{filepath},{format_size(size)},{created_time},{modified_time}\n"
+
+# Number of file records formatted per task when the output file is formatted in worker processes
+FORMAT_CHUNK = 10000
+
+# Write buffer for the file list and the output file, so millions of lines go out in few write calls
+WRITE_BUFFER = 1 << 20
+
+# Function to format a chunk of file records into one encoded block of output lines, run in a worker process
+def _format_chunk(records):
+    return os.fsencode("".join(format_file_line(*record) for record in records))
+
+# Function to list the archived files from the file records buffered during the scan;
+# only the records of the given file paths get formatted, spread over a process pool when there are many
+def list_files_in_dir(file_records, file_paths, output_file):
+    # Overlapping base paths buffer the same file twice and the parallel scan finishes
+    # directories in any order, so drop duplicates and sort the records by path
+    records = sorted(record for record in set(file_records) if record[0] in file_paths)
+    chunks = [records[i:i + FORMAT_CHUNK] for i in range(0, len(records), FORMAT_CHUNK)]
+    workers = os.cpu_count() or 1
+    with open(output_file, 'ab', buffering=WRITE_BUFFER) as f:
+        if len(chunks) < 2 or workers < 2:
+            f.writelines(map(_format_chunk, chunks))
+            return
+        # Chunks come back in order, so the report stays sorted while the workers format ahead
+        with multiprocessing.Pool(min(workers, len(chunks))) as pool:
+            f.writelines(pool.imap(_format_chunk, chunks, chunksize=4))
+
+# Function to calculate free space on the filesystem the archive is written to
+def check_disk_space(required_space, archive_name):
+    st = os.statvfs(os.path.dirname(os.path.abspath(archive_name)) or '.')
+    free = st.f_bavail * st.f_frsize
     return free >= required_space, free
 
+# Tokens accepted at the selection prompts: directory numbers, ranges like 3-7, ALL or NONE
+_TOK = re.compile(r'\b(?:(\d+)(?:-(\d+))?|(all|none))\b', re.I)
+
+# Function to parse a selection answer into directory numbers in a single regex pass
+def parse_selection(text, count):
+    numbers = {}
+    keyword = None
+    for match in _TOK.finditer(text):
+        if match.group(1):
+            start = int(match.group(1))
+            if match.group(2):
+                end = int(match.group(2))
+                start, end = min(start, end), max(start, end)
+                # Ranges only expand to numbers that are on the list
+                numbers.update(dict.fromkeys(range(max(start, 1), min(end, count) + 1)))
+            elif 1 <= start <= count:  # Single numbers off the list are dropped the same way
+                numbers[start] = None
+        elif keyword != 'none':
+            keyword = match.group(3).lower()
+    if keyword == 'none':
+        return []
+    if keyword == 'all':
+        return list(range(1, count + 1))
+    return list(numbers)
+
 # Handle graceful shutdown on Ctrl+C
 def signal_handler(sig, frame):
     print("\nShutdown requested... exiting gracefully.")
+    # Stop the scan threads: drop queued directory reads and let the running ones bail out
+    _stop.set()
+    _scan_executor.shutdown(wait=False, cancel_futures=True)
     sys.exit(0)
 
 import signal
@@ -184,10 +432,14 @@ def main():
         return
 
     prior_date = start_date - timedelta(days=30)
+    start_ts = start_date.timestamp()
+
+    # Per-file records for the optional output file are gathered during the scans
+    file_records = [] if len(sys.argv) > 1 and sys.argv[1] == "-o" else None
 
     # Handle priority directories first
     print(f"Scanning priority directories for files {'modified' if use_modified else 'created'} since the specified date...")
-    priority_files = get_directory_info(start_date, use_modified=use_modified, base_paths=PRIORITY_DIRECTORIES)
+    priority_files = scan_directories(start_ts, use_modified=use_modified, base_paths=PRIORITY_DIRECTORIES, output_buffer=file_records)
     new_dirs = list_directory_info(priority_files, "Priority Directories:", 1)
 
     final_dirs = []
@@ -200,15 +452,8 @@ def main():
         print("Invalid option. Please enter 'S' to select or 'I' to ignore.")
         return
 
-    prompt_message = "\nPlease enter the numbers of directories to " + ("select" if action.lower() == 's' else "ignore") + " (comma or space separated, type ALL for all, or NONE to skip): "
-    selected_dirs = input(prompt_message).split()
-
-    if 'none' in [s.lower() for s in selected_dirs]:
-        selected_dirs = []
-    elif 'all' in [s.lower() for s in selected_dirs]:
-        selected_dirs = list(range(1, len(new_dirs) + 1))
-    else:
-        selected_dirs = [int(i) for i in selected_dirs if i.isdigit()]
+    prompt_message = "\nPlease enter the numbers of directories to " + ("select" if action.lower() == 's' else "ignore") + " (comma or space separated, ranges like 3-7, type ALL for all, or NONE to skip): "
+    selected_dirs = parse_selection(input(prompt_message), len(new_dirs))
 
     if action.lower() == 's':
         final_dirs = [new_dirs[i-1] for i in selected_dirs]
@@ -223,7 +468,7 @@ def main():
     proceed = input("\nDo you want to search non-priority directories as well? (y/n): ")
     if proceed.lower() == 'y':
         print(f"Scanning additional directories for files {'modified' if use_modified else 'created'} since the specified date...")
-        non_priority_files = get_directory_info(start_date, use_modified=use_modified, base_paths=TARGET_DIRECTORIES)
+        non_priority_files = scan_directories(start_ts, use_modified=use_modified, base_paths=TARGET_DIRECTORIES, output_buffer=file_records)
         additional_dirs = list_directory_info(non_priority_files, "Additional Directories:", len(final_dirs) + 1)
 
         action = input("\nDo you want to (S)elect or (I)gnore directories from the additional list? ")
@@ -231,15 +476,8 @@ def main():
             print("Invalid option. Please enter 'S' to select or 'I' to ignore.")
             return
 
-        prompt_message = "\nPlease enter the numbers of directories to " + ("select" if action.lower() == 's' else "ignore") + " (comma or space separated, type ALL for all, or NONE to skip): "
-        selected_dirs = input(prompt_message).split()
-
-        if 'none' in [s.lower() for s in selected_dirs]:
-            selected_dirs = []
-        elif 'all' in [s.lower() for s in selected_dirs]:
-            selected_dirs = list(range(1, len(additional_dirs) + 1))
-        else:
-            selected_dirs = [int(i) for i in selected_dirs if i.isdigit()]
+        prompt_message = "\nPlease enter the numbers of directories to " + ("select" if action.lower() == 's' else "ignore") + " (comma or space separated, ranges like 3-7, type ALL for all, or NONE to skip): "
+        selected_dirs = parse_selection(input(prompt_message), len(additional_dirs))
 
         if action.lower() == 's':
             final_dirs.extend([additional_dirs[i-1] for i in selected_dirs])
@@ -250,9 +488,10 @@ def main():
         # Remove ignored directories and their subdirectories from the final list
         final_dirs = [dir_path for dir_path in final_dirs if not any(dir_path.startswith(ignored_dir) for ignored_dir in ignored_dirs)]
 
-    # Calculate total size of selected directories
-    total_size = sum(priority_files[dir_path]['size'] for dir_path in final_dirs if dir_path in priority_files) + \
-                 sum(non_priority_files[dir_path]['size'] for dir_path in final_dirs if dir_path in non_priority_files)
+    # Calculate total size from the files inside the time window that will actually be archived; the directory
+    # sizes above also carry the older files below them, and a file under two selected directories counts once
+    matching_files = get_matching_files(final_dirs, start_ts)
+    total_size = sum(size for _, size in matching_files)
 
     # Display total size before proceeding
     print(f"\nThe total size of files to be archived is \033[1m{format_size(total_size)}\033[0m")
@@ -263,8 +502,9 @@ def main():
         print("Archiving canceled by user.")
         return
 
-    # Check disk space
-    has_space, free_space = check_disk_space(total_size)
+    # Check disk space where the archive will be written
+    archive_name = "archive.7z"
+    has_space, free_space = check_disk_space(total_size, archive_name)
     if not has_space:
         print(f"Not enough disk space. Required: {format_size(total_size)}, Available: {format_size(free_space)}")
         return
@@ -275,47 +515,55 @@ def main():
             return
 
     # Get password and archive
-    password = input("Please enter a password for the archive: ")
-
-    # Prepare the list of directories with ARCHIVE/ prefix and full paths preserved
-    with open("filelist.txt", "w") as file_list:
-        for dir_path in final_dirs:
-            for root, _, files in os.walk(dir_path):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    if not is_excluded_path(filepath):
-                        # Quote the file path to avoid issues with special characters
-                        filepath_quoted = f'"{filepath}"'
-                        archive_path = f"ARCHIVE/{os.path.relpath(filepath, '/')}"
-                        file_list.write(f"{filepath_quoted}\n")
-
-    # Create the 7z archive with the directory structure preserved under ARCHIVE/ using file list
-    archive_name = "archive.7z"
-    command = ["7z", "a", "-p" + password, "-mhe=on", archive_name, "@filelist.txt"]
-    result = subprocess.run(command, capture_output=True, text=True)
+    password = getpass("Please enter a password for the archive: ")
 
-    # Check if the archiving process encountered any errors
-    if result.returncode == 0:
-        print("Archiving completed successfully.")
-    else:
-        print("Archiving failed with errors:")
-        print(result.stderr)
-
-    # Clean up temporary file list
-    os.remove("filelist.txt")
-
-    # Optionally output to file with detailed info
-    if len(sys.argv) > 1 and sys.argv[1] == "-o":
-        output_file = sys.argv[2]
-        with open(output_file, 'w') as f:
-            f.write(f"Directories containing files {'modified' if use_modified else 'created'} since {start_date_input}:\n" + "-"*80 + "\n")
-            for dir_path, info in priority_files.items():
-                f.write(f"({info['count']})\t{dir_path}\t{format_size(info['size'])}\n")
-            f.write(f"\nDirectories containing files {'modified' if use_modified else 'created'} within 1 mo. prior to {start_date_input}:\n" + "-"*80 + "\n")
-            for dir_path, info in non_priority_files.items():
-                f.write(f"({info['count']})\t{dir_path}\t{format_size(info['size'])}\n")
-        list_files_in_dir({dir_path: priority_files[dir_path] for dir_path in final_dirs if dir_path in priority_files}, output_file)
-        list_files_in_dir({dir_path: non_priority_files[dir_path] for dir_path in final_dirs if dir_path in non_priority_files}, output_file)
+    # Prepare the list of matching files from the scan results instead of walking the selected directories again.
+    # 7z reads its list file by size up front, so it can't be fed through a pipe; a private temporary file is used
+    list_fd, list_path = tempfile.mkstemp(prefix="kleanup-", suffix=".txt")
+    process = None
+    log_name = None
+    try:
+        with os.fdopen(list_fd, "wb", buffering=WRITE_BUFFER) as file_list:
+            for i in range(0, len(matching_files), 1000):
+                # Quote the file paths to avoid issues with special characters
+                file_list.write(os.fsencode("".join(f'"{filepath}"\n' for filepath, _ in matching_files[i:i + 1000])))
+
+        # Start the 7z archive with full paths preserved (-spf) using the file list; it compresses
+        # in the background while the optional report below is written. Its messages go straight
+        # to a new log file next to the archive rather than piling up in memory
+        command = ["7z", "a", "-p" + password, "-mhe=on", "-spf", archive_name, "@" + list_path]
+        log_fd, log_name = tempfile.mkstemp(prefix="kleanup-7z-", suffix=".log", dir=os.path.dirname(os.path.abspath(archive_name)))
+        with os.fdopen(log_fd, 'w') as log:
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=log)
+
+        # Optionally output to file with detailed info
+        if len(sys.argv) > 1 and sys.argv[1] == "-o":
+            output_file = sys.argv[2]
+            # Assemble the directory summary in memory and write it with a single call, encoded like the file lines below
+            lines = [f"Directories containing files {'modified' if use_modified else 'created'} since {start_date_input}:\n" + "-"*80 + "\n"]
+            lines.extend(f"({info['count']})\t{dir_path}\t{format_size(info['size'])}\n" for dir_path, info in sorted(priority_files.items()))
+            lines.append(f"\nDirectories containing files {'modified' if use_modified else 'created'} within 1 mo. prior to {start_date_input}:\n" + "-"*80 + "\n")
+            lines.extend(f"({info['count']})\t{dir_path}\t{format_size(info['size'])}\n" for dir_path, info in sorted(non_priority_files.items()))
+            with open(output_file, 'wb', buffering=WRITE_BUFFER) as f:
+                f.write(os.fsencode("".join(lines)))
+            list_files_in_dir(file_records, {filepath for filepath, _ in matching_files}, output_file)
+
+        # Wait for 7z and check if the archiving process encountered any errors
+        if process.wait() == 0:
+            print("Archiving completed successfully.")
+        else:
+            print(f"Archiving failed with errors (full log in {log_name}):")
+            with open(log_name, errors='replace') as log:
+                print("".join(deque(log, maxlen=20)), end="")
+    finally:
+        # Clean up the temporary file list, also when 7z can't be started, the report fails or the run is
+        # interrupted; a running 7z (which gets the same Ctrl+C) is waited for so the list isn't pulled from under it
+        if process is not None:
+            process.wait()
+        os.remove(list_path)
+        # 7z's log is only kept when it failed; it's empty when 7z couldn't be started at all
+        if log_name is not None and (process is None or process.returncode == 0):
+            os.remove(log_name)
 
 if __name__ == "__main__":
     main()